@@ -84,6 +84,8 @@ TEMP_DIR.mkdir(parents=True, exist_ok=True)
 
 # Supported HTTP methods per OpenAPI 3.0 spec
 HTTP_METHODS = ["get", "post", "put", "delete", "patch", "head", "options", "trace"]
+# Same methods as a frozenset for O(1) membership checks on path item keys
+HTTP_METHODS_SET = frozenset(HTTP_METHODS)
 
 
 
@@ -9,13 +9,12 @@ from typing import Dict, Optional
 from fastapi import APIRouter, File, HTTPException, Query, UploadFile
 from fastapi.responses import StreamingResponse
 
-from src.config import HTTP_METHODS, USE_LLM_ENHANCE
+from src.config import USE_LLM_ENHANCE
 from src.services.markdown_generator import generate_markdown_from_openapi
 from src.services.docx_builder import build_docx_document
 from src.services.openapi_parser import count_endpoints
 from src.utils.filename import build_output_filename
 from src.utils.validation import validate_openapi_spec
-from src.utils.schema_resolver import clear_schema_cache
 
 logger = logging.getLogger(__name__)
 
@@ -79,9 +78,6 @@ async def generate_documentation(
 
         # Validate OpenAPI structure per OpenAPI 3.0 spec
         validate_openapi_spec(openapi_spec)
-        
-        # Clear schema cache before processing new spec (per performance best practices)
-        clear_schema_cache()
 
         # Determine generation mode: only two modes available
         # 1. Fast mode (use_llm_enhance=false): local parsing only
@@ -4,6 +4,7 @@ Per FastAPI and documentation best practices.
 """
 import json
 import logging
+import re
 from typing import Any, Dict, List, Optional, Tuple
 
 import requests
@@ -367,6 +368,9 @@ def clear_translation_cache():
 # Cache for generated field descriptions
 _field_description_cache: Dict[str, str] = {}
 
+# Max fields per batched description request (keeps the prompt and reply within max_tokens)
+_FIELD_DESCRIPTION_BATCH_SIZE = 25
+
 
 def generate_field_description(field_name: str, field_type: str, context: Optional[Dict[str, Any]] = None) -> str:
     """
@@ -460,6 +464,162 @@ def generate_field_description(field_name: str, field_type: str, context: Option
     return ""
 
 
+def generate_field_descriptions_batch(
+    fields: List[Tuple[str, str, Optional[Dict[str, Any]]]],
+) -> List[str]:
+    """
+    Сгенерировать описания для нескольких полей пакетными запросами к LLM.
+    
+    Args:
+        fields: Список кортежей (field_name, field_type, context), как у generate_field_description
+        
+    Returns:
+        Список описаний в порядке входных полей; пустая строка, если описание не получено
+    """
+    results = [""] * len(fields)
+    # Одинаковые поля (например, id в нескольких схемах) запрашиваются один раз
+    pending: Dict[str, List[int]] = {}
+    to_generate: List[Tuple[str, str, str, Optional[Dict[str, Any]]]] = []
+    
+    for index, (field_name, field_type, context) in enumerate(fields):
+        if not field_name:
+            continue
+        cache_key = f"{field_name}_{field_type}_{context.get('location', '') if context else ''}"
+        if cache_key in _field_description_cache:
+            results[index] = _field_description_cache[cache_key]
+        elif cache_key in pending:
+            pending[cache_key].append(index)
+        else:
+            pending[cache_key] = [index]
+            to_generate.append((cache_key, field_name, field_type, context))
+    
+    if not to_generate:
+        return results
+    
+    # Нет настроек LLM — возвращаем пустые описания
+    if not LM_STUDIO_API_URL or not isinstance(LM_STUDIO_API_URL, str) or not LM_STUDIO_API_URL.strip():
+        logger.debug(f"LLM not configured (LM_STUDIO_API_URL is not set), skipping description generation for {len(to_generate)} fields")
+        return results
+    
+    if not LM_STUDIO_API_URL.startswith(('http://', 'https://')):
+        logger.debug(f"Invalid LM_STUDIO_API_URL format, skipping description generation for {len(to_generate)} fields")
+        return results
+    
+    for start in range(0, len(to_generate), _FIELD_DESCRIPTION_BATCH_SIZE):
+        batch = to_generate[start:start + _FIELD_DESCRIPTION_BATCH_SIZE]
+        generated = _generate_field_descriptions_chunk(batch)
+        for (cache_key, _, _, _), description in zip(batch, generated):
+            for index in pending[cache_key]:
+                results[index] = description
+    
+    return results
+
+
+def _generate_field_descriptions_chunk(
+    batch: List[Tuple[str, str, str, Optional[Dict[str, Any]]]],
+) -> List[str]:
+    """
+    Один запрос к LLM для части полей (см. generate_field_descriptions_batch).
+    Поля, которых нет в разобранном ответе, генерируются по одному через generate_field_description;
+    если из ответа не удалось разобрать ни одного описания, описания остаются пустыми.
+    """
+    fields_list = []
+    for number, (_, field_name, field_type, context) in enumerate(batch, start=1):
+        context_info = ""
+        if context:
+            if context.get("location"):
+                context_info += f", расположение: {context['location']}"
+            if context.get("parent"):
+                context_info += f", родительский объект: {context['parent']}"
+        fields_list.append(f"{number}. {field_name} ({field_type}{context_info})")
+    
+    prompt = f"""Сгенерируй краткие описания для полей API на русском языке.
+
+Поля:
+{chr(10).join(fields_list)}
+
+Для каждого поля создай краткое (1 предложение, максимум 50 символов), понятное описание на русском языке, объясняющее назначение этого поля.
+Описание должно быть техническим и точным.
+Верни ответ в формате JSON массив, где каждый элемент:
+{{"index": номер поля, "description": "описание"}}
+
+Верни только JSON, без дополнительных комментариев."""
+    
+    try:
+        url = f"{LM_STUDIO_API_URL}/chat/completions"
+        payload: Dict[str, Any] = {
+            "model": MODEL_NAME,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "Ты эксперт по API документации. Создавай краткие, технические описания полей. Всегда отвечай валидным JSON."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "max_tokens": min(60 * len(batch), 2000),  # Scale with batch size
+            "temperature": 0.3
+        }
+        
+        logger.info(f"Batch generating descriptions for {len(batch)} fields")
+        response = requests.post(url, json=payload, headers=HEADERS, timeout=60)
+        response.raise_for_status()
+        result = response.json()
+    except Exception as exc:
+        # Сервис недоступен - по одному спрашивать бессмысленно, оставляем описания пустыми
+        logger.debug(f"Failed to batch generate field descriptions: {exc}")
+        return [""] * len(batch)
+    
+    generated: Dict[int, str] = {}
+    try:
+        content = result["choices"][0].get("message", {}).get("content", "").strip()
+        logger.info(f"LLM batch field description response:\n{content}")
+        
+        # Extract JSON from markdown code blocks if present
+        if "```json" in content:
+            content = content.split("```json")[1].split("```")[0].strip()
+        elif "```" in content:
+            content = content.split("```")[1].split("```")[0].strip()
+        array_match = re.search(r'\[.*\]', content, re.DOTALL)
+        if array_match:
+            content = array_match.group(0)
+        
+        items = json.loads(content)
+        if not isinstance(items, list):
+            raise ValueError("Response is not a list")
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get("description"), str):
+                continue
+            index = item.get("index")
+            if not isinstance(index, (int, str)):
+                logger.debug(f"Skipping batch field description item without a valid index: {item}")
+                continue
+            try:
+                generated[int(index)] = item["description"]
+            except ValueError:
+                logger.debug(f"Skipping batch field description item without a valid index: {item}")
+    except (IndexError, KeyError, TypeError, ValueError) as e:
+        logger.warning(f"Failed to parse batch field description response: {e}")
+    
+    if not generated:
+        # Ответ не разобран - запросы по одному полю только умножили бы обращения к LLM
+        return [""] * len(batch)
+    
+    from src.services.markdown_generator import sanitize_text
+    descriptions = []
+    for number, (cache_key, field_name, field_type, context) in enumerate(batch, start=1):
+        description = generated.get(number, "").strip().strip('"').strip("'").strip()
+        if description:
+            description = sanitize_text(description)
+            _field_description_cache[cache_key] = description
+        else:
+            description = generate_field_description(field_name, field_type, context)
+        descriptions.append(description)
+    return descriptions
+
+
 def clear_field_description_cache():
     """Clear the field description cache."""
     global _field_description_cache
@@ -3,6 +3,7 @@ Markdown documentation generator per documentation.mdc best practices.
 Generates structured Markdown from OpenAPI specifications.
 Supports both local parsing and LLM-based generation.
 """
+import io
 import json
 import re
 import logging
@@ -13,11 +14,43 @@ from src.services.openapi_parser import (
     group_operations_by_tag, count_endpoints, determine_authentication,
     build_parameter_rows, get_success_response_schema, describe_schema_fields,
     build_request_example, build_response_example, determine_interface_mode,
-    select_preferred_media, build_example_from_schema,
+    select_preferred_media, build_example_from_schema, fill_field_descriptions,
+    ParamRow, ResponseField, PendingDescription,
 )
+from src.utils.schema_resolver import SchemaResolver
+
+try:
+    from src.services.llm_service import (
+        enhance_descriptions_batch,
+        enhance_description_with_llm,
+        translate_to_russian,
+    )
+    _HAS_LLM = True
+except Exception:
+    _HAS_LLM = False
 
 logger = logging.getLogger(__name__)
 
+# Граница предложения: пробелы после . ! ?
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Шаблоны очистки Markdown (общие для sanitize_text и sanitize_text_preserve_structure)
+_RE_MD_HEADER = re.compile(r"#{1,6}\s*")
+_RE_MD_BOLD_STARS = re.compile(r"\*\*([^*]+)\*\*")
+_RE_MD_BOLD_UNDERSCORES = re.compile(r"__([^_]+)__")
+_RE_MD_ITALIC_STARS = re.compile(r"\*([^*]+)\*")
+_RE_MD_ITALIC_UNDERSCORES = re.compile(r"_([^_]+)_")
+_RE_MD_ITALIC_STARS_INLINE = re.compile(r"(?<!^)\*([^*\n]+)\*(?!\s*-)")
+_RE_MD_ITALIC_UNDERSCORES_INLINE = re.compile(r"(?<!^)_([^_\n]+)_(?!\s*-)")
+_RE_MD_STRAY_STAR_INLINE = re.compile(r"(?<!^)\*(?!\s*-)")
+_RE_MD_CODE_BLOCK = re.compile(r"```[^`]*```")
+_RE_MD_INLINE_CODE = re.compile(r"`([^`]+)`")
+_RE_MD_LINK = re.compile(r"\[([^\]]+)\]\([^\)]+\)")
+_RE_MD_LIST_MARKER = re.compile(r"^\s*[-*+]\s+", re.MULTILINE)
+_RE_EMOJI = re.compile(r"[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF\U00002702-\U000027B0\U000024C2-\U0001F251]+")
+# Оставшиеся маркеры * и _ удаляются целиком
+_MD_MARKERS_DELETE = str.maketrans("", "", "*_")
+
 def generate_markdown_from_openapi(openapi_spec: Dict[str, Any], use_llm: bool = False, use_llm_enhance: Optional[bool] = None, max_endpoints: Optional[int] = None) -> str:
     """
     Сформировать Markdown-документ в соответствии с шаблоном template_files/api_template.md.
@@ -70,33 +103,18 @@ def generate_markdown_local(openapi_spec: Dict[str, Any], enhance_descriptions:
     if not grouped_operations:
         return "# 📘 API-документация\n\nНет доступных эндпоинтов в спецификации."
 
-    total_endpoints = count_endpoints(openapi_spec)
-    processed_endpoints = sum(len(ops) for ops in grouped_operations.values())
-    endpoint_info = f"{processed_endpoints} эндпоинтов"
-    if max_endpoints and processed_endpoints < total_endpoints:
-        endpoint_info += f" (из {total_endpoints} по спецификации)"
-    else:
-        endpoint_info += f" по спецификации OpenAPI версии {openapi_spec.get('openapi', 'unknown')}"
-    
-    md_lines: List[str] = [
-        "# 📘 API-документация",
-        "",
-        endpoint_info,
-        "",
-    ]
-
     # Batch enhance descriptions if enabled - ONLY FOR LIMITED ENDPOINTS
     enhanced_descriptions: Dict[str, str] = {}
-    if enhance_descriptions:
+    if enhance_descriptions and _HAS_LLM:
         try:
-            from src.services.llm_service import enhance_descriptions_batch
-            
             # Collect all descriptions that need enhancement - ONLY FROM LIMITED OPERATIONS
             descriptions_to_enhance: List[Tuple[str, Dict[str, Any]]] = []
+            limited_endpoints = 0
             for tag, operations in grouped_operations.items():
+                limited_endpoints += len(operations)
                 for endpoint in operations:
-                    operation = endpoint["operation"]
-                    description = operation.get("description") or f"{endpoint['method']} запрос к {endpoint['path']}"
+                    operation = endpoint.operation
+                    description = operation.get("description") or f"{endpoint.method} запрос к {endpoint.path}"
                     if len(description or "") >= 160:
                         continue
                     
@@ -105,14 +123,14 @@ def generate_markdown_local(openapi_spec: Dict[str, Any], enhance_descriptions:
                     descriptions_to_enhance.append((
                         description,
                         {
-                            "method": endpoint["method"],
-                            "path": endpoint["path"],
+                            "method": endpoint.method,
+                            "path": endpoint.path,
                             "summary": operation.get("summary") or operation.get("operationId", ""),
                             "tag": tag
                         }
                     ))
             
-            logger.info(f"Found {len(descriptions_to_enhance)} descriptions to enhance (from {processed_endpoints} limited endpoints)")
+            logger.info(f"Found {len(descriptions_to_enhance)} descriptions to enhance (from {limited_endpoints} limited endpoints)")
             if descriptions_to_enhance:
                 logger.info(f"Batch enhancing {len(descriptions_to_enhance)} descriptions")
                 enhanced_descriptions = enhance_descriptions_batch(descriptions_to_enhance)
@@ -123,31 +141,70 @@ def generate_markdown_local(openapi_spec: Dict[str, Any], enhance_descriptions:
             logger.warning(f"Batch enhancement failed, falling back to individual: {str(e)}")
             enhanced_descriptions = {}
 
+    # Разрешённые $ref общие для всех эндпоинтов одной спецификации
+    resolver = SchemaResolver(openapi_spec)
+
+    # Строки параметров и полей ответа собираются заранее для всех эндпоинтов: поля без описания
+    # со всего документа уходят в LLM одним пакетом, а не отдельным запросом на каждый эндпоинт
+    prebuilt_fields: Dict[int, Tuple[List[ParamRow], List[ResponseField]]] = {}
+    if enhance_descriptions:
+        pending: List[PendingDescription] = []
+        for operations in grouped_operations.values():
+            for endpoint in operations:
+                endpoint_rows = build_parameter_rows(
+                    endpoint.operation,
+                    openapi_spec,
+                    path_parameters=endpoint.path_parameters or [],
+                    enhance_descriptions=True,
+                    resolver=resolver,
+                    pending=pending,
+                )
+                response_schema = get_success_response_schema(endpoint.operation, openapi_spec, resolver=resolver)
+                endpoint_fields = describe_schema_fields(
+                    response_schema, openapi_spec, enhance_descriptions=True, resolver=resolver, pending=pending
+                )
+                prebuilt_fields[id(endpoint)] = (endpoint_rows, endpoint_fields)
+        logger.info(f"Found {len(pending)} fields without description (from {len(prebuilt_fields)} endpoints)")
+        fill_field_descriptions(pending)
+
+    # Секции пишутся сразу в буфер, без общего списка строк на весь документ
+    body = io.StringIO()
     overall_index = 1
 
     for tag, operations in grouped_operations.items():
-        md_lines.append(f"## ИНТЕРФЕЙСЫ ВЗАИМОДЕЙСТВИЯ — {tag}")
-        md_lines.append("")
+        body.write(f"## ИНТЕРФЕЙСЫ ВЗАИМОДЕЙСТВИЯ — {tag}\n\n")
         for index, endpoint in enumerate(operations, start=1):
-            md_lines.extend(
-                render_endpoint_section(
-                    index=overall_index,
-                    tag=tag,
-                    path=endpoint["path"],
-                    method=endpoint["method"],
-                    operation=endpoint["operation"],
-                    path_parameters=endpoint.get("path_parameters") or [],
-                    path_item=endpoint.get("path_item") or {},
-                    openapi_spec=openapi_spec,
-                    enhance_descriptions=enhance_descriptions,
-                    enhanced_descriptions=enhanced_descriptions,
-                )
+            prebuilt = prebuilt_fields.get(id(endpoint))
+            section = render_endpoint_section(
+                index=overall_index,
+                tag=tag,
+                path=endpoint.path,
+                method=endpoint.method,
+                operation=endpoint.operation,
+                path_parameters=endpoint.path_parameters or [],
+                path_item=endpoint.path_item or {},
+                openapi_spec=openapi_spec,
+                enhance_descriptions=enhance_descriptions,
+                enhanced_descriptions=enhanced_descriptions,
+                resolver=resolver,
+                parameter_rows=prebuilt[0] if prebuilt else None,
+                response_fields=prebuilt[1] if prebuilt else None,
             )
-            md_lines.append("---")
-            md_lines.append("")
+            body.write("\n".join(section))
+            body.write("\n---\n\n")
             overall_index += 1
 
-    return "\n".join(md_lines).strip()
+    # Заголовок формируем после основного прохода: число эндпоинтов уже посчитано
+    total_endpoints = count_endpoints(openapi_spec)
+    processed_endpoints = overall_index - 1
+    endpoint_info = f"{processed_endpoints} эндпоинтов"
+    if max_endpoints and processed_endpoints < total_endpoints:
+        endpoint_info += f" (из {total_endpoints} по спецификации)"
+    else:
+        endpoint_info += f" по спецификации OpenAPI версии {openapi_spec.get('openapi', 'unknown')}"
+
+    header = f"# 📘 API-документация\n\n{endpoint_info}\n\n"
+    return (header + body.getvalue()).rstrip()
 
 def render_endpoint_section(
     index: int,
@@ -160,6 +217,9 @@ def render_endpoint_section(
     openapi_spec: Dict[str, Any],
     enhance_descriptions: bool = False,
     enhanced_descriptions: Optional[Dict[str, str]] = None,
+    resolver: Optional[SchemaResolver] = None,
+    parameter_rows: Optional[List[ParamRow]] = None,
+    response_fields: Optional[List[ResponseField]] = None,
 ) -> List[str]:
     """
     Сформировать блок Markdown для одного метода в рамках выбранного тега.
@@ -167,6 +227,9 @@ def render_endpoint_section(
     Args:
         enhance_descriptions: If True, use LLM to enhance short/missing descriptions
         enhanced_descriptions: Pre-enhanced descriptions from batch processing
+        resolver: $ref resolver (with its cache) shared across one conversion
+        parameter_rows: Pre-built parameter rows (field descriptions already filled in batch)
+        response_fields: Pre-built response fields (field descriptions already filled in batch)
     """
     summary = (
         operation.get("summary")
@@ -178,30 +241,33 @@ def render_endpoint_section(
     original_description = operation.get("description") or f"{method} запрос к {path}"
     original_description = translate_text_if_needed(original_description)
     description = original_description
+    # Разбиваем исходное описание один раз и переиспользуем результат ниже
+    original_parts = split_description_content(original_description)
     
     # Use pre-enhanced description from batch if available
     if enhanced_descriptions and original_description in enhanced_descriptions:
         enhanced_desc = enhanced_descriptions[original_description]
         # Preserve structured blocks (Parameters/Returns/Raises) from original
-        intro_original, structured_original = split_description_content(original_description)
+        intro_original, structured_original = original_parts
         intro_enhanced, structured_enhanced = split_description_content(enhanced_desc)
         
         # Use enhanced intro, but keep original structured blocks if they exist
         if structured_original:
             description = f"{intro_enhanced}\n\n{structured_original}" if intro_enhanced else structured_original
+            description_parts = (intro_enhanced, structured_original)
         else:
             # No structured blocks in original, use enhanced as-is
             description = enhanced_desc
+            description_parts = (intro_enhanced, structured_enhanced)
         
         # Clean only markdown formatting, preserve structure
-        description = sanitize_text_preserve_structure(description)
+        description = sanitize_text_preserve_structure(description, parts=description_parts)
         logger.debug(f"Using enhanced description for {method} {path}")
     # Fallback to individual enhancement if batch didn't cover it
-    elif enhance_descriptions:
+    elif enhance_descriptions and _HAS_LLM:
         try:
-            from src.services.llm_service import enhance_description_with_llm
             # Split to preserve structured blocks
-            intro_original, structured_original = split_description_content(description)
+            intro_original, structured_original = original_parts
             
             # Enhance only the intro part
             if intro_original:
@@ -227,33 +293,49 @@ def render_endpoint_section(
             logger.warning(f"Failed to enhance description for {method} {path}: {str(e)}")
             # Continue with original description
     auth_info = determine_authentication(operation, openapi_spec)
-    parameter_rows = build_parameter_rows(operation, openapi_spec, path_parameters=path_parameters, enhance_descriptions=enhance_descriptions)
+    if parameter_rows is None:
+        parameter_rows = build_parameter_rows(
+            operation,
+            openapi_spec,
+            path_parameters=path_parameters,
+            enhance_descriptions=enhance_descriptions,
+            resolver=resolver,
+        )
     for row in parameter_rows:
         # Переводим только если описание не было сгенерировано через LLM (LLM уже возвращает русский текст)
         # и описание не пустое и не "Нет описания"
-        desc = row.get("description", "")
-        if desc and desc != "Нет описания" and desc.strip():
-            row["description"] = translate_text_if_needed(desc)
-
-    response_schema = get_success_response_schema(operation, openapi_spec)
-    response_fields = describe_schema_fields(response_schema, openapi_spec, enhance_descriptions=enhance_descriptions)
+        desc = row.description
+        if not row.llm_generated and desc and desc != "Нет описания" and desc.strip():
+            row.description = translate_text_if_needed(desc)
+
+    if response_fields is None:
+        response_schema = get_success_response_schema(operation, openapi_spec, resolver=resolver)
+        response_fields = describe_schema_fields(
+            response_schema, openapi_spec, enhance_descriptions=enhance_descriptions, resolver=resolver
+        )
     for field in response_fields:
         # Переводим только если описание не было сгенерировано через LLM (LLM уже возвращает русский текст)
         # и описание не пустое
-        desc = field.get("description", "")
-        if desc and desc.strip():
-            field["description"] = translate_text_if_needed(desc)
-    request_example = build_request_example(operation, openapi_spec)
-    response_example = build_response_example(operation, openapi_spec)
+        desc = field.description
+        if not field.llm_generated and desc and desc.strip():
+            field.description = translate_text_if_needed(desc)
+    request_example = build_request_example(operation, openapi_spec, resolver=resolver)
+    response_example = build_response_example(operation, openapi_spec, resolver=resolver)
 
     interface_mode = determine_interface_mode(operation, openapi_spec, path_item=path_item)
 
     summary_clean = sanitize_text(summary)
     heading_source = operation.get("description") or operation.get("summary") or summary
-    intro_text_raw, detail_text_raw = split_description_content(description or "")
+    if description is original_description:
+        intro_text_raw, detail_text_raw = original_parts
+    else:
+        intro_text_raw, detail_text_raw = split_description_content(description or "")
     intro_text = sanitize_text(intro_text_raw or heading_source)
     # Preserve structured blocks in detail_text (Parameters/Returns/Raises)
-    detail_text = sanitize_text_preserve_structure(detail_text_raw) if detail_text_raw else ""
+    detail_text = (
+        sanitize_text_preserve_structure(detail_text_raw, parts=("", detail_text_raw))
+        if detail_text_raw else ""
+    )
     intro_items = format_as_bullet_list(intro_text)
     has_structured_detail = bool(detail_text.strip())
     detail_items = (
@@ -305,7 +387,7 @@ def render_endpoint_section(
     if response_fields:
         for field in response_fields:
             section.append(
-                f"| {field['name']} | {field['type']} | {field['description']} |"
+                f"| {field.name} | {field.type} | {field.description} |"
             )
     else:
         section.extend(
@@ -315,7 +397,7 @@ def render_endpoint_section(
             ]
         )
 
-    error_examples = build_error_examples(operation, openapi_spec)
+    error_examples = build_error_examples(operation, openapi_spec, resolver=resolver)
     section.extend(
         [
             "",
@@ -352,7 +434,7 @@ def render_endpoint_section(
 
     return section
 
-def format_parameters_table(rows: List[Dict[str, Any]]) -> List[str]:
+def format_parameters_table(rows: List[ParamRow]) -> List[str]:
     """
     Представить параметры в виде таблицы Markdown.
     """
@@ -368,7 +450,7 @@ def format_parameters_table(rows: List[Dict[str, Any]]) -> List[str]:
 
     for row in rows:
         table.append(
-            f"| {row['name']} | {row['in']} | {row['type']} | {row['description']} | {'Да' if row.get('required') else 'Нет'} |"
+            f"| {row.name} | {row.location} | {row.type} | {row.description} | {'Да' if row.required else 'Нет'} |"
         )
 
     table.append("")
@@ -382,13 +464,19 @@ def format_json_block(payload: Any) -> str:
     return f"```json\n{json_text}\n```"
 
 
-def build_error_examples(operation: Dict[str, Any], openapi_spec: Dict[str, Any]) -> List[Any]:
+def build_error_examples(
+    operation: Dict[str, Any],
+    openapi_spec: Dict[str, Any],
+    resolver: Optional[SchemaResolver] = None,
+) -> List[Any]:
     """
     Собрать примеры ошибок из 4xx/5xx ответов, если они есть в спецификации.
     """
     responses = operation.get("responses", {})
     error_codes = [code for code in responses.keys() if str(code).startswith(("4", "5"))]
     examples: List[Any] = []
+    # Ответы с ошибками обычно делят одну схему - строим её пример один раз
+    example_cache: Dict[int, Tuple[Dict[str, Any], Any, int]] = {}
 
     for status in sorted(error_codes)[:3]:
         response = responses.get(status, {})
@@ -412,7 +500,9 @@ def build_error_examples(operation: Dict[str, Any], openapi_spec: Dict[str, Any]
 
         schema = media.get("schema")
         if schema:
-            examples.append(build_example_from_schema(schema, openapi_spec))
+            examples.append(
+                build_example_from_schema(schema, openapi_spec, resolver=resolver, example_cache=example_cache)
+            )
 
     return examples
 
@@ -423,39 +513,21 @@ def sanitize_text(value: Optional[str]) -> str:
     if not value:
         return ""
 
-    text = str(value).strip()
-    # Remove markdown headers (####, ###, ##, #) - anywhere in text, including standalone
-    text = re.sub(r"#{1,6}\s*", "", text)
-    # Remove markdown bold/italic (**text**, *text*, __text__, _text_)
-    text = re.sub(r"\*\*([^*]+)\*\*", r"\1", text)  # **bold**
-    text = re.sub(r"\*([^*]+)\*", r"\1", text)     # *italic*
-    text = re.sub(r"__([^_]+)__", r"\1", text)     # __bold__
-    text = re.sub(r"_([^_]+)_", r"\1", text)       # _italic_
-    # Remove remaining markdown markers
-    text = re.sub(r"[*_]{1,2}", "", text)
-    # Remove emojis (Unicode emoji ranges)
-    text = re.sub(r"[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF\U00002702-\U000027B0\U000024C2-\U0001F251]+", "", text)
-    # Remove markdown code blocks and inline code
-    text = re.sub(r"```[^`]*```", "", text)  # Code blocks
-    text = re.sub(r"`[^`]+`", "", text)      # Inline code
-    # Remove markdown links [text](url)
-    text = re.sub(r"\[([^\]]+)\]\([^\)]+\)", r"\1", text)
-    # Remove markdown lists markers at start of line
-    text = re.sub(r"^\s*[-*+]\s+", "", text, flags=re.MULTILINE)
-    # Remove extra whitespace
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
+    return _sanitize_markdown(str(value).strip(), preserve_structure=False)
 
 
-def sanitize_text_preserve_structure(value: Optional[str]) -> str:
+def sanitize_text_preserve_structure(value: Optional[str], parts: Optional[Tuple[str, str]] = None) -> str:
     """
     Удалить Markdown-выделения, но сохранить структурированные блоки (Parameters/Returns/Raises).
+
+    Args:
+        parts: Уже готовый результат split_description_content(value), если он известен вызывающему
     """
     if not value:
         return ""
 
     # Split into intro and structured blocks
-    intro, structured = split_description_content(value)
+    intro, structured = parts if parts is not None else split_description_content(value)
     
     # Clean intro part
     intro_clean = sanitize_text(intro) if intro else ""
@@ -463,26 +535,7 @@ def sanitize_text_preserve_structure(value: Optional[str]) -> str:
     # Keep structured blocks as-is (they contain important information)
     if structured:
         # Clean markdown formatting in structured blocks, but preserve structure
-        structured_clean = structured
-        # Remove headers
-        structured_clean = re.sub(r"#{1,6}\s*", "", structured_clean)
-        # Remove emojis
-        structured_clean = re.sub(r"[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF\U00002702-\U000027B0\U000024C2-\U0001F251]+", "", structured_clean)
-        # Remove markdown bold/italic (**text**, *text*, __text__, _text_)
-        # First remove **bold** patterns
-        structured_clean = re.sub(r"\*\*([^*]+)\*\*", r"\1", structured_clean)  # **bold**
-        # Then remove __bold__ patterns
-        structured_clean = re.sub(r"__([^_]+)__", r"\1", structured_clean)     # __bold__
-        # Remove *italic* but preserve list markers (lines starting with - or *)
-        structured_clean = re.sub(r"(?<!^)\*([^*\n]+)\*(?!\s*-)", r"\1", structured_clean)  # *italic* not in lists
-        structured_clean = re.sub(r"(?<!^)_([^_\n]+)_(?!\s*-)", r"\1", structured_clean)  # _italic_ not in lists
-        # Remove any remaining standalone ** or * (but not list markers)
-        structured_clean = re.sub(r"\*\*", "", structured_clean)  # Remove remaining **
-        structured_clean = re.sub(r"(?<!^)\*(?!\s*-)", "", structured_clean)  # Remove * not at start of line/list
-        # Remove markdown links
-        structured_clean = re.sub(r"\[([^\]]+)\]\([^\)]+\)", r"\1", structured_clean)
-        # Remove inline code markers (but preserve code blocks if needed)
-        structured_clean = re.sub(r"`([^`]+)`", r"\1", structured_clean)
+        structured_clean = _sanitize_markdown(structured, preserve_structure=True)
         
         if intro_clean:
             return f"{intro_clean}\n\n{structured_clean}"
@@ -491,13 +544,68 @@ def sanitize_text_preserve_structure(value: Optional[str]) -> str:
     
     return intro_clean
 
+
+def _sanitize_markdown(text: str, preserve_structure: bool) -> str:
+    """
+    Общая очистка Markdown для sanitize_text и sanitize_text_preserve_structure.
+
+    При preserve_structure=True сохраняются маркеры списков, переносы строк,
+    блоки кода и содержимое inline-кода; иначе текст сводится к одной строке.
+    """
+    # Remove markdown headers (####, ###, ##, #) - anywhere in text, including standalone
+    text = _RE_MD_HEADER.sub("", text)
+
+    if preserve_structure:
+        text = _strip_emoji(text)
+        text = _RE_MD_BOLD_STARS.sub(r"\1", text)      # **bold**
+        text = _RE_MD_BOLD_UNDERSCORES.sub(r"\1", text)  # __bold__
+        # Remove *italic* / _italic_ but preserve list markers (lines starting with - or *)
+        text = _RE_MD_ITALIC_STARS_INLINE.sub(r"\1", text)
+        text = _RE_MD_ITALIC_UNDERSCORES_INLINE.sub(r"\1", text)
+        # Remove any remaining standalone ** or * (but not list markers)
+        text = text.replace("**", "")
+        text = _RE_MD_STRAY_STAR_INLINE.sub("", text)
+        text = _RE_MD_LINK.sub(r"\1", text)
+        # Remove inline code markers, keep the code itself
+        return _RE_MD_INLINE_CODE.sub(r"\1", text)
+
+    # Remove markdown bold/italic (**text**, *text*, __text__, _text_)
+    text = _RE_MD_BOLD_STARS.sub(r"\1", text)
+    text = _RE_MD_ITALIC_STARS.sub(r"\1", text)
+    text = _RE_MD_BOLD_UNDERSCORES.sub(r"\1", text)
+    text = _RE_MD_ITALIC_UNDERSCORES.sub(r"\1", text)
+    # Remove remaining markdown markers
+    text = text.translate(_MD_MARKERS_DELETE)
+    text = _strip_emoji(text)
+    # Remove markdown code blocks and inline code
+    text = _RE_MD_CODE_BLOCK.sub("", text)
+    text = _RE_MD_INLINE_CODE.sub("", text)
+    # Remove markdown links [text](url)
+    text = _RE_MD_LINK.sub(r"\1", text)
+    # Remove markdown lists markers at start of line
+    text = _RE_MD_LIST_MARKER.sub("", text)
+    # Collapse whitespace
+    return " ".join(text.split())
+
+def _strip_emoji(text: str) -> str:
+    """
+    Удалить эмоджи. ASCII-строки не могут их содержать, для них regex не запускается.
+    """
+    if text.isascii():
+        return text
+    return _RE_EMOJI.sub("", text)
+
 def split_into_sentences(text: str) -> List[str]:
     """
     Разбить текст на предложения.
     """
     if not text:
         return []
-    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
+    text = text.strip()
+    # Без знаков конца предложения разбивать нечего - обходимся без regex
+    if "." not in text and "!" not in text and "?" not in text:
+        return [text] if text else []
+    sentences = _SENTENCE_SPLIT_RE.split(text)
     return [sentence.strip() for sentence in sentences if sentence.strip()]
 
 def translate_header(header: str) -> str:
@@ -697,9 +805,7 @@ def translate_text_if_needed(text: Optional[str]) -> str:
     if not text or contains_cyrillic(text):
         return text or ""
 
-    try:
-        from src.services.llm_service import translate_to_russian
-    except Exception:
+    if not _HAS_LLM:
         return text
 
     try:
@@ -3,52 +3,156 @@ OpenAPI specification parser per OpenAPI 3.0 spec.
 Extracts and processes operations, parameters, schemas, and examples.
 """
 import logging
-from typing import Any, Dict, List, Optional, Tuple
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
-from src.config import HTTP_METHODS
-from src.utils.schema_resolver import resolve_schema, get_schema_type
+from src.config import HTTP_METHODS_SET
+from src.utils.schema_resolver import SchemaResolver, needs_resolution, resolve_schema, get_schema_type
+
+try:
+    from src.services.llm_service import generate_field_descriptions_batch
+    _HAS_LLM = True
+except Exception:
+    _HAS_LLM = False
 
 logger = logging.getLogger(__name__)
 
-def group_operations_by_tag(openapi_spec: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+# Тег для операций без tags; неизменяемый кортеж можно переиспользовать без аллокаций
+_DEFAULT_TAGS = ("API",)
+
+# Коды успешного ответа, которые проверяются прямым поиском до перебора остальных 2xx
+_PREFERRED_SUCCESS_STATUSES = ("200", "201", "202")
+
+# Маркер "пример не найден" для _first_media_example (None - допустимое значение примера)
+_NO_EXAMPLE = object()
+
+# Известные написания режима интерфейса -> каноническое значение
+_INTERFACE_MODE_ALIASES: Dict[str, str] = {
+    "sync": "Синхронный",
+    "synchronous": "Синхронный",
+    "синхронный": "Синхронный",
+    "синхрон": "Синхронный",
+    "async": "Асинхронный",
+    "asynchronous": "Асинхронный",
+    "асинхронный": "Асинхронный",
+    "асинхрон": "Асинхронный",
+}
+
+# Поле, ждущее описания от LLM: (строка, имя поля, тип, контекст, хвост описания)
+PendingDescription = Tuple[Any, str, str, Dict[str, str], str]
+
+# Ключевые слова асинхронного режима в описании ("asynchronous" покрывается "async");
+# IGNORECASE работает и для кириллицы, поэтому текст не нужно копировать через lower()
+_ASYNC_RE = re.compile(r"async|асинхрон", re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class GroupedOperation:
     """
-    Group operations by tags per OpenAPI 3.0 spec section 3.1.0.
-    Operations without tags use default tag "API".
+    Операция в группе тега (см. group_operations_by_tag).
+    """
+    path: str
+    method: str
+    operation: Dict[str, Any]
+    path_item: Dict[str, Any]
+    path_parameters: List[Dict[str, Any]]
+
+
+@dataclass(slots=True)
+class ParamRow:
+    """
+    Строка таблицы параметров запроса (параметр или поле тела).
+    Изменяемая: описание переводится/дополняется уже после сборки строк.
+    """
+    name: str
+    location: str
+    type: str
+    description: str
+    required: bool = False
+    # Описание сгенерировано LLM - повторно не переводится
+    llm_generated: bool = False
+
+
+@dataclass(slots=True)
+class ResponseField:
+    """
+    Строка таблицы полей успешного ответа.
+    """
+    name: str
+    type: str
+    description: str
+    llm_generated: bool = False
+
+
+def _resolve(
+    schema: Dict[str, Any],
+    openapi_spec: Dict[str, Any],
+    resolver: Optional[SchemaResolver],
+) -> Dict[str, Any]:
     """
-    paths = openapi_spec.get("paths", {})
-    if not paths:
+    Разрешить $ref через resolver, а без него - разовым вызовом resolve_schema.
+
+    resolver создаётся на одну конвертацию (одну спецификацию) и держит кэш
+    разрешённых ссылок сам. Встроенная схема без $ref возвращается как есть.
+    """
+    if not isinstance(schema, dict) or not schema:
         return {}
+    if "$ref" not in schema:
+        return schema
+    if resolver is None:
+        return resolve_schema(schema, openapi_spec)
+    return resolver.resolve(schema)
+
 
-    grouped: Dict[str, List[Dict[str, Any]]] = {}
-    default_tag = "API"
+def iter_operations(
+    openapi_spec: Dict[str, Any],
+    log_invalid: bool = True,
+) -> Iterator[Tuple[str, Dict[str, Any], str, Dict[str, Any]]]:
+    """
+    Обойти все операции спецификации за один проход по paths.
 
+    Args:
+        openapi_spec: Parsed OpenAPI specification.
+        log_invalid: Логировать пропущенные некорректные path item и операции.
+
+    Yields:
+        Кортежи (path, path_item, METHOD, operation).
+    """
+    paths = openapi_spec.get("paths") or {}
     for path, path_item in paths.items():
         # Validate path format per OpenAPI 3.0 spec section 3.1.0
         if not isinstance(path_item, dict):
-            logger.warning(f"Skipping invalid path item for '{path}': expected object")
+            if log_invalid:
+                logger.warning(f"Skipping invalid path item for '{path}': expected object")
             continue
 
-        path_parameters = path_item.get("parameters", [])
-
         for method, operation in path_item.items():
-            if method.lower() not in HTTP_METHODS:
+            # Ключи методов почти всегда в нижнем регистре - lower() только как запасной вариант
+            if method not in HTTP_METHODS_SET and method.lower() not in HTTP_METHODS_SET:
                 continue
-            
+
             if not isinstance(operation, dict):
-                logger.warning(f"Skipping invalid operation for {method.upper()} {path}: expected object")
+                if log_invalid:
+                    logger.warning(f"Skipping invalid operation for {method.upper()} {path}: expected object")
                 continue
 
-            tags = operation.get("tags") or [default_tag]
-            for tag in tags:
-                grouped.setdefault(tag, []).append(
-                    {
-                        "path": path,
-                        "method": method.upper(),
-                        "operation": operation,
-                        "path_item": path_item,
-                        "path_parameters": path_parameters,
-                    }
-                )
+            yield path, path_item, method.upper(), operation
+
+def group_operations_by_tag(openapi_spec: Dict[str, Any]) -> Dict[str, List[GroupedOperation]]:
+    """
+    Group operations by tags per OpenAPI 3.0 spec section 3.1.0.
+    Operations without tags use default tag "API".
+    """
+    grouped: Dict[str, List[GroupedOperation]] = {}
+
+    for path, path_item, method, operation in iter_operations(openapi_spec):
+        path_parameters = path_item.get("parameters", [])
+        tags = operation.get("tags") or _DEFAULT_TAGS
+        for tag in tags:
+            grouped.setdefault(tag, []).append(
+                GroupedOperation(path, method, operation, path_item, path_parameters)
+            )
 
     return grouped
 
@@ -63,13 +167,8 @@ def count_endpoints(openapi_spec: Dict[str, Any]) -> int:
     Returns:
         int: Total number of endpoints.
     """
-    count = 0
-    paths = openapi_spec.get("paths", {})
-    for path_data in paths.values():
-        for method in HTTP_METHODS:
-            if method in path_data:
-                count += 1
-    return count
+    # Считаем те же операции, что попадают в документ; предупреждения уже выдал group_operations_by_tag
+    return sum(1 for _ in iter_operations(openapi_spec, log_invalid=False))
 
 def determine_authentication(operation: Dict[str, Any], openapi_spec: Dict[str, Any]) -> str:
     """
@@ -82,7 +181,9 @@ def determine_authentication(operation: Dict[str, Any], openapi_spec: Dict[str,
     if not security:
         return "Нет аутентификации"
 
-    scheme_name = next(iter(security[0].keys()), None)
+    # Итерация по dict сразу даёт ключи; не-объект в security[0] не должен ронять генерацию
+    first_requirement = security[0]
+    scheme_name = next(iter(first_requirement), None) if isinstance(first_requirement, dict) else None
     if not scheme_name:
         return "OAuth2PasswordBearer"
 
@@ -98,39 +199,41 @@ def determine_interface_mode(
     """
     Определить режим интерфейса (синхронный/асинхронный) на основе расширений или описания.
     """
-    candidates = [
-        operation.get("x-interface-mode"),
-        operation.get("x_interface_mode"),
-        operation.get("x-interface-type"),
-        operation.get("x-interface"),
-        operation.get("x-mode"),
-        path_item.get("x-interface-mode") if path_item else None,
-        path_item.get("x_interface_mode") if path_item else None,
-        openapi_spec.get("x-interface-mode"),
-        openapi_spec.get("info", {}).get("x-interface-mode"),
-    ]
-
-    for candidate in candidates:
+    for candidate in _iter_interface_mode_candidates(operation, openapi_spec, path_item):
         normalized = normalize_interface_mode(candidate)
         if normalized:
             return normalized
 
-    text_blob = " ".join(
-        filter(
-            None,
-            [
-                operation.get("description", ""),
-                operation.get("summary", ""),
-                operation.get("operationId", ""),
-            ],
-        )
-    ).lower()
-
-    if any(keyword in text_blob for keyword in ("async", "асинхрон", "asynchronous")):
-        return "Асинхронный"
+    # Поля проверяются по отдельности: без склейки в одну строку и с выходом на первом совпадении
+    for field in ("description", "summary", "operationId"):
+        value = operation.get(field)
+        if value and _ASYNC_RE.search(value):
+            return "Асинхронный"
 
     return "Синхронный"
 
+def _iter_interface_mode_candidates(
+    operation: Dict[str, Any],
+    openapi_spec: Dict[str, Any],
+    path_item: Optional[Dict[str, Any]],
+) -> Iterator[Any]:
+    """
+    Перечислить значения расширений режима в порядке приоритета: операция, path item, спецификация.
+    Значения читаются лениво, поэтому при найденном на операции режиме остальные не запрашиваются.
+    """
+    yield operation.get("x-interface-mode")
+    yield operation.get("x_interface_mode")
+    yield operation.get("x-interface-type")
+    yield operation.get("x-interface")
+    yield operation.get("x-mode")
+    if path_item:
+        yield path_item.get("x-interface-mode")
+        yield path_item.get("x_interface_mode")
+    yield openapi_spec.get("x-interface-mode")
+    info = openapi_spec.get("info")
+    if info:
+        yield info.get("x-interface-mode")
+
 def normalize_interface_mode(value: Optional[Any]) -> Optional[str]:
     """
     Привести произвольное значение режима к ожидаемому формату.
@@ -142,29 +245,34 @@ def normalize_interface_mode(value: Optional[Any]) -> Optional[str]:
     if not raw:
         return None
 
-    sync_aliases = {"sync", "synchronous", "синхронный", "синхрон"}
-    async_aliases = {"async", "asynchronous", "асинхронный", "асинхрон"}
-
-    if raw in sync_aliases:
-        return "Синхронный"
-    if raw in async_aliases:
-        return "Асинхронный"
-
-    return raw.capitalize()
+    return _INTERFACE_MODE_ALIASES.get(raw) or raw.capitalize()
 
 def build_parameter_rows(
     operation: Dict[str, Any],
     openapi_spec: Dict[str, Any],
     path_parameters: Optional[List[Dict[str, Any]]] = None,
     enhance_descriptions: bool = False,
-) -> List[Dict[str, Any]]:
+    resolver: Optional[SchemaResolver] = None,
+    pending: Optional[List[PendingDescription]] = None,
+) -> List[ParamRow]:
     """
     Собрать сведения о параметрах пути, запроса, заголовков и тела.
     
     Args:
         enhance_descriptions: Если True, использовать LLM для генерации описаний для полей без описания
+        resolver: Разрешение $ref с кэшем на одну конвертацию (см. SchemaResolver);
+            без него заводится локальный resolver на время вызова
+        pending: Общий список полей без описания на весь документ; поля добавляются в него,
+            а описания заполняет вызывающая сторона (fill_field_descriptions).
+            Без него описания запрашиваются одним пакетом в конце вызова
     """
-    rows: List[Dict[str, Any]] = []
+    if resolver is None:
+        resolver = SchemaResolver(openapi_spec)
+    rows: List[ParamRow] = []
+    # Поля без описания собираются и отправляются в LLM одним пакетом в конце
+    fill_here = pending is None
+    if pending is None:
+        pending = []
 
     all_parameters: List[Dict[str, Any]] = []
     if path_parameters:
@@ -172,25 +280,12 @@ def build_parameter_rows(
     all_parameters.extend(operation.get("parameters", []))
 
     for parameter in deduplicate_parameters(all_parameters):
-        schema = extract_parameter_schema(parameter, openapi_spec)
+        schema = extract_parameter_schema(parameter, openapi_spec, resolver)
+        field_name = parameter.get("name", "-")
+        location = parameter.get("in", "-")
+        field_type = get_schema_type(schema)
         description = parameter.get("description") or schema.get("description") or ""
         
-        # Генерируем описание через LLM, если оно пустое и включен режим улучшения
-        if not description and enhance_descriptions:
-            field_name = parameter.get("name", "-")
-            field_type = get_schema_type(schema)
-            try:
-                from src.services.llm_service import generate_field_description
-                generated = generate_field_description(
-                    field_name=field_name,
-                    field_type=field_type,
-                    context={"location": parameter.get("in", "-")}
-                )
-                if generated:
-                    description = generated
-            except Exception as e:
-                logger.debug(f"Failed to generate description for parameter '{field_name}': {e}")
-        
         extras = []
         if "default" in schema:
             extras.append(f"По умолчанию: {schema['default']}")
@@ -202,198 +297,220 @@ def build_parameter_rows(
             extras.append(f"explode: {parameter['explode']}")
         if "example" in schema:
             extras.append(f"Пример: {schema['example']}")
-        if extras:
-            description = f"{description}. " + "; ".join(extras)
-        required = parameter.get("required", False) or parameter.get("in") == "path"
-        rows.append(
-            {
-                "name": parameter.get("name", "-"),
-                "in": parameter.get("in", "-"),
-                "type": get_schema_type(schema),
-                "description": description,
-                "required": required,
-            }
-        )
+        # Сведения о значении дописываются и к описанию, сгенерированному LLM позже
+        suffix = ". " + "; ".join(extras) if extras else ""
+        required = parameter.get("required", False) or location == "path"
+        row = ParamRow(field_name, location, field_type, description + suffix, required)
+        # Генерируем описание через LLM, если оно пустое и включен режим улучшения
+        if not description and enhance_descriptions:
+            pending.append((row, field_name, field_type, {"location": location}, suffix))
+        rows.append(row)
 
     request_body = operation.get("requestBody")
     if request_body:
         required = request_body.get("required", False)
         content = request_body.get("content", {})
         media_type, media = select_preferred_media(content)
-        if media is None:
-            return rows
-
-        schema = resolve_schema(media.get("schema", {}), openapi_spec)
-        rows.append(
-            {
-                "name": "—",
-                "in": "body",
-                "type": get_schema_type(schema),
-                "description": media.get("description", "Тело запроса"),
-                "required": required,
-            }
-        )
-        rows.extend(
-            extract_schema_properties(
-                schema=schema,
-                openapi_spec=openapi_spec,
-                location="body",
-                parent_name="body",
-                enhance_descriptions=enhance_descriptions,
+        if media is not None:
+            schema = _resolve(media.get("schema", {}), openapi_spec, resolver)
+            body_type = get_schema_type(schema)
+            rows.append(
+                ParamRow(
+                    name="—",
+                    location="body",
+                    type=body_type,
+                    description=media.get("description", "Тело запроса"),
+                    required=required,
+                )
             )
-        )
+            # Поля есть только у объекта; тип тела уже известен, повторно его не вычисляем
+            if body_type == "object":
+                rows.extend(
+                    _schema_property_rows(
+                        schema, openapi_spec, "body", "body", resolver, pending if enhance_descriptions else None
+                    )
+                )
 
+    if fill_here:
+        fill_field_descriptions(pending)
     return rows
 
-def get_success_response_schema(operation: Dict[str, Any], openapi_spec: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+def get_success_response_schema(
+    operation: Dict[str, Any],
+    openapi_spec: Dict[str, Any],
+    resolver: Optional[SchemaResolver] = None,
+) -> Optional[Dict[str, Any]]:
     """
     Извлечь схему основного успешного ответа (200/201/2xx).
     """
-    responses = operation.get("responses", {})
-    response = None
-    for status in ("200", "201", "202"):
-        if status in responses:
-            response = responses[status]
-            break
-
-    if response is None:
-        for status_code, resp in responses.items():
-            if status_code.startswith("2"):
-                response = resp
-                break
-        if response is None:
-            response = responses.get("default")
-
+    response = _select_success_response(operation.get("responses", {}))
     if not response:
         return None
 
     content = response.get("content", {})
     _, media = select_preferred_media(content)
     if media:
-        schema = resolve_schema(media.get("schema", {}), openapi_spec)
+        schema = _resolve(media.get("schema", {}), openapi_spec, resolver)
         if schema:
             return schema
 
     return None
 
-def describe_schema_fields(schema: Optional[Dict[str, Any]], openapi_spec: Dict[str, Any], enhance_descriptions: bool = False) -> List[Dict[str, str]]:
+def _select_success_response(responses: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Выбрать успешный ответ: сначала 200/201/202, иначе 2xx с наименьшим кодом, иначе default.
+    Общий порядок поиска для таблицы полей ответа и примера ответа.
+    """
+    for status in _PREFERRED_SUCCESS_STATUSES:
+        response = responses.get(status)
+        if response is not None:
+            return response
+
+    # Наименьший код, а не первый в документе: результат не зависит от порядка ключей
+    status_code = min(
+        (code for code in responses if isinstance(code, str) and code.startswith("2")),
+        default=None,
+    )
+    if status_code is not None:
+        return responses[status_code]
+    return responses.get("default")
+
+def describe_schema_fields(
+    schema: Optional[Dict[str, Any]],
+    openapi_spec: Dict[str, Any],
+    enhance_descriptions: bool = False,
+    resolver: Optional[SchemaResolver] = None,
+    pending: Optional[List[PendingDescription]] = None,
+) -> List[ResponseField]:
     """
     Описать поля схемы ответа для таблицы.
     
     Args:
         enhance_descriptions: Если True, использовать LLM для генерации описаний для полей без описания
+        resolver: Разрешение $ref с кэшем на одну конвертацию (см. SchemaResolver);
+            без него заводится локальный resolver на время вызова
+        pending: Общий список полей без описания (см. build_parameter_rows)
     """
     if not schema:
         return []
+    if resolver is None:
+        resolver = SchemaResolver(openapi_spec)
 
-    resolved = resolve_schema(schema, openapi_spec)
+    resolved = _resolve(schema, openapi_spec, resolver)
     schema_type = get_schema_type(resolved)
 
     if schema_type == "object":
         properties = resolved.get("properties", {})
         if not properties:
-            return [{"name": "result", "type": "object", "description": resolved.get("description", "Ответ сервиса")}]
-
-        fields = []
-        for name, prop_schema in properties.items():
-            # Получаем description из исходной схемы или из resolved схемы
-            original_description = prop_schema.get("description") if isinstance(prop_schema, dict) else None
-            resolved_prop = resolve_schema(prop_schema, openapi_spec)
-            resolved_description = resolved_prop.get("description") if isinstance(resolved_prop, dict) else None
-            description = original_description or resolved_description or ""
-            
-            # Генерируем описание через LLM, если оно пустое и включен режим улучшения
-            if not description and enhance_descriptions:
-                field_type = get_schema_type(resolved_prop)
-                try:
-                    from src.services.llm_service import generate_field_description
-                    generated = generate_field_description(
-                        field_name=name,
-                        field_type=field_type,
-                        context={"location": "response"}
-                    )
-                    if generated:
-                        description = generated
-                except Exception as e:
-                    logger.debug(f"Failed to generate description for response field '{name}': {e}")
-            
-            fields.append(
-                {
-                    "name": name,
-                    "type": get_schema_type(resolved_prop),
-                    "description": description,
-                }
-            )
-        return fields
+            return [ResponseField("result", "object", resolved.get("description", "Ответ сервиса"))]
+
+        return _describe_response_properties(
+            properties,
+            openapi_spec,
+            enhance_descriptions,
+            resolver,
+            name_prefix="",
+            llm_context={"location": "response"},
+            pending=pending,
+        )
 
     if schema_type == "array":
-        item_schema = resolve_schema(resolved.get("items", {}), openapi_spec)
+        item_schema = _resolve(resolved.get("items", {}), openapi_spec, resolver)
         item_type = get_schema_type(item_schema)
 
         # Раскрываем поля объекта внутри массива
         if item_type == "object" and item_schema.get("properties"):
-            fields = []
-            for name, prop_schema in item_schema.get("properties", {}).items():
-                # Получаем description из исходной схемы или из resolved схемы
-                original_description = prop_schema.get("description") if isinstance(prop_schema, dict) else None
-                resolved_prop = resolve_schema(prop_schema, openapi_spec)
-                resolved_description = resolved_prop.get("description") if isinstance(resolved_prop, dict) else None
-                description = original_description or resolved_description or ""
-                
-                # Генерируем описание через LLM, если оно пустое и включен режим улучшения
-                if not description and enhance_descriptions:
-                    field_type = get_schema_type(resolved_prop)
-                    try:
-                        from src.services.llm_service import generate_field_description
-                        generated = generate_field_description(
-                            field_name=name,
-                            field_type=field_type,
-                            context={"location": "response", "parent": "array item"}
-                        )
-                        if generated:
-                            description = generated
-                    except Exception as e:
-                        logger.debug(f"Failed to generate description for array item field '{name}': {e}")
-                
-                fields.append(
-                    {
-                        "name": f"items.{name}",
-                        "type": get_schema_type(resolved_prop),
-                        "description": description,
-                    }
-                )
-            return fields
-
-        return [
-            {
-                "name": "items[]",
-                "type": f"array<{item_type}>",
-                "description": resolved.get("description", "Список элементов"),
-            }
-        ]
+            return _describe_response_properties(
+                item_schema["properties"],
+                openapi_spec,
+                enhance_descriptions,
+                resolver,
+                name_prefix="items.",
+                llm_context={"location": "response", "parent": "array item"},
+                pending=pending,
+            )
+
+        return [ResponseField("items[]", f"array<{item_type}>", resolved.get("description", "Список элементов"))]
 
-    return [
-        {
-            "name": "value",
-            "type": schema_type,
-            "description": resolved.get("description", "Ответ сервиса"),
-        }
+    return [ResponseField("value", schema_type, resolved.get("description", "Ответ сервиса"))]
+
+def _describe_response_properties(
+    properties: Dict[str, Any],
+    openapi_spec: Dict[str, Any],
+    enhance_descriptions: bool,
+    resolver: Optional[SchemaResolver],
+    name_prefix: str,
+    llm_context: Dict[str, str],
+    pending: Optional[List[PendingDescription]] = None,
+) -> List[ResponseField]:
+    """
+    Описать свойства объекта ответа (общий цикл для объекта и элемента массива).
+    """
+    # Локальные имена вместо поиска в globals на каждой итерации
+    resolve = _resolve
+    schema_type_of = get_schema_type
+    fields = [
+        ResponseField(
+            name_prefix + name,
+            schema_type_of(resolved_prop := resolve(prop_schema, openapi_spec, resolver)),
+            _property_description(prop_schema, resolved_prop) or "",
+        )
+        for name, prop_schema in properties.items()
     ]
 
+    # Генерируем описания через LLM для пустых полей, если включен режим улучшения
+    if enhance_descriptions:
+        missing: List[PendingDescription] = [
+            (field, name, field.type, llm_context, "")
+            for name, field in zip(properties, fields)
+            if not field.description
+        ]
+        if pending is not None:
+            pending.extend(missing)
+        else:
+            fill_field_descriptions(missing)
+    return fields
+
 def extract_schema_properties(
     schema: Dict[str, Any],
     openapi_spec: Dict[str, Any],
     location: str,
     parent_name: str,
     enhance_descriptions: bool = False,
-) -> List[Dict[str, Any]]:
+    resolver: Optional[SchemaResolver] = None,
+) -> List[ParamRow]:
     """
     Получить список полей схемы (используется для описания requestBody).
     
     Args:
         enhance_descriptions: Если True, использовать LLM для генерации описаний для полей без описания
+        resolver: Разрешение $ref с кэшем на одну конвертацию (см. SchemaResolver)
+    """
+    pending: Optional[List[PendingDescription]] = [] if enhance_descriptions else None
+    rows = _schema_property_rows(schema, openapi_spec, location, parent_name, resolver, pending)
+    if pending:
+        fill_field_descriptions(pending)
+    return rows
+
+def _schema_property_rows(
+    schema: Dict[str, Any],
+    openapi_spec: Dict[str, Any],
+    location: str,
+    parent_name: str,
+    resolver: Optional[SchemaResolver],
+    pending: Optional[List[PendingDescription]],
+) -> List[ParamRow]:
+    """
+    Строки для свойств объекта (см. extract_schema_properties). Поля без описания
+    добавляются в pending, если он передан; описания заполняет вызывающая сторона.
     """
-    resolved = resolve_schema(schema, openapi_spec)
+    # Встроенная схема с явным не-объектным типом (массив, строка...) - разрешать нечего
+    if isinstance(schema, dict) and "$ref" not in schema:
+        declared_type = schema.get("type")
+        if declared_type is not None and declared_type != "object":
+            return []
+
+    resolved = _resolve(schema, openapi_spec, resolver)
     schema_type = get_schema_type(resolved)
 
     if schema_type != "object":
@@ -401,270 +518,366 @@ def extract_schema_properties(
 
     properties = resolved.get("properties", {})
     required_fields = set(resolved.get("required", []))
-    rows: List[Dict[str, Any]] = []
-
-    for name, prop_schema in properties.items():
-        # Получаем description из исходной схемы или из resolved схемы
-        original_description = prop_schema.get("description") if isinstance(prop_schema, dict) else None
-        resolved_prop = resolve_schema(prop_schema, openapi_spec)
-        resolved_description = resolved_prop.get("description") if isinstance(resolved_prop, dict) else None
-        description = original_description or resolved_description or "Нет описания"
-        
-        # Генерируем описание через LLM, если оно "Нет описания" или пустое и включен режим улучшения
-        if (description == "Нет описания" or not description) and enhance_descriptions:
-            field_type = get_schema_type(resolved_prop)
-            try:
-                from src.services.llm_service import generate_field_description
-                generated = generate_field_description(
-                    field_name=name,
-                    field_type=field_type,
-                    context={"location": location, "parent": parent_name}
-                )
-                if generated:
-                    description = generated
-            except Exception as e:
-                logger.debug(f"Failed to generate description for field '{name}': {e}")
-        
-        rows.append(
-            {
-                "name": f"{parent_name}.{name}",
-                "in": location,
-                "type": get_schema_type(resolved_prop),
-                "description": description,
-                "required": name in required_fields,
-            }
+    # Локальные имена вместо поиска в globals на каждой итерации
+    resolve = _resolve
+    schema_type_of = get_schema_type
+    prefix = parent_name + "."
+    rows = [
+        ParamRow(
+            prefix + name,
+            location,
+            schema_type_of(resolved_prop := resolve(prop_schema, openapi_spec, resolver)),
+            _property_description(prop_schema, resolved_prop) or "Нет описания",
+            name in required_fields,
+        )
+        for name, prop_schema in properties.items()
+    ]
+
+    # Поля без описания ждут генерации через LLM
+    if pending is not None:
+        context = {"location": location, "parent": parent_name}
+        pending.extend(
+            (row, name, row.type, context, "")
+            for name, row in zip(properties, rows)
+            if row.description == "Нет описания"
         )
 
     return rows
 
-def build_request_example(operation: Dict[str, Any], openapi_spec: Dict[str, Any]) -> Any:
+def _property_description(prop_schema: Any, resolved_prop: Dict[str, Any]) -> Optional[str]:
+    """
+    Описание свойства: из исходной схемы, а из resolved - только если в исходной его нет.
+    """
+    description = prop_schema.get("description") if isinstance(prop_schema, dict) else None
+    if not description:
+        description = resolved_prop.get("description")
+    return description
+
+def fill_field_descriptions(pending: List[PendingDescription]) -> None:
+    """
+    Получить описания для отложенных полей одним пакетным запросом к LLM и записать их в строки.
+    Поля, для которых LLM ничего не вернула, остаются как есть.
+    """
+    if not pending or not _HAS_LLM:
+        return
+    try:
+        generated = generate_field_descriptions_batch(
+            [(name, field_type, context) for _, name, field_type, context, _ in pending]
+        )
+    except Exception as e:
+        logger.debug(f"Failed to generate descriptions for {len(pending)} fields: {e}")
+        return
+    for (row, _, _, _, suffix), description in zip(pending, generated):
+        if description:
+            row.description = description + suffix
+            row.llm_generated = True
+
+def build_request_example(
+    operation: Dict[str, Any],
+    openapi_spec: Dict[str, Any],
+    resolver: Optional[SchemaResolver] = None,
+) -> Any:
     """
     Build request example per OpenAPI 3.0 spec section 3.1.0.
     Prefers 'examples' over deprecated 'example' field.
     """
     request_body = operation.get("requestBody")
     if request_body:
-        content = request_body.get("content", {})
-        _, media = select_preferred_media(content)
-        if media:
-            # Prefer 'examples' over deprecated 'example' (per OpenAPI spec)
-            examples = media.get("examples")
-            if examples:
-                example_value = next(iter(examples.values()))
-                if isinstance(example_value, dict):
-                    return example_value.get("value")
-                return example_value
-
-            # Fallback to deprecated 'example' field
-            if "example" in media:
-                logger.debug("Using deprecated 'example' field. Consider using 'examples' instead.")
-                return media["example"]
-
-            # Generate from schema if no examples provided
-            schema = resolve_schema(media.get("schema", {}), openapi_spec)
-            if schema:
-                return build_example_from_schema(schema, openapi_spec)
+        example = _first_media_example(request_body.get("content", {}), openapi_spec, resolver)
+        if example is not _NO_EXAMPLE:
+            return example
 
+    # Параметры часто ссылаются на одни и те же схемы - общий кэш примеров на операцию
+    example_cache: Dict[int, Tuple[Dict[str, Any], Any, int]] = {}
     params_example = {}
     for parameter in operation.get("parameters", []):
-        schema = resolve_schema(parameter.get("schema", {}), openapi_spec)
-        params_example[parameter.get("name", "param")] = build_example_from_schema(schema, openapi_spec)
+        schema = _resolve(parameter.get("schema", {}), openapi_spec, resolver)
+        params_example[parameter.get("name", "param")] = build_example_from_schema(
+            schema, openapi_spec, resolver=resolver, example_cache=example_cache
+        )
 
     return params_example or {"example": "value"}
 
-def build_response_example(operation: Dict[str, Any], openapi_spec: Dict[str, Any]) -> Any:
+def build_response_example(
+    operation: Dict[str, Any],
+    openapi_spec: Dict[str, Any],
+    resolver: Optional[SchemaResolver] = None,
+) -> Any:
     """
     Build response example per OpenAPI 3.0 spec section 3.1.0.
     Prioritizes 2xx status codes and prefers 'examples' over deprecated 'example'.
     """
     responses = operation.get("responses", {})
     # Prioritize 2xx status codes per OpenAPI best practices
-    for status in ("200", "201", "202"):
-        if status in responses:
-            response = responses[status]
-            break
-    else:
-        # Fallback to any 2xx response
-        for status_code, resp in responses.items():
-            if status_code.startswith("2"):
-                response = resp
-                break
-        else:
-            response = responses.get("default") or next(iter(responses.values()), None)
+    response = _select_success_response(responses)
+    if not response and responses:
+        # Любой ответ: берём наименьший код, чтобы выбор не зависел от порядка ключей
+        response = responses[min(responses, key=str)]
 
     if not response:
         return {"errorCode": 0, "errorMessage": ""}
 
-    content = response.get("content", {})
-    _, media = select_preferred_media(content)
-    if media:
-        # Prefer 'examples' over deprecated 'example' (per OpenAPI spec)
-        examples = media.get("examples")
-        if examples:
-            example_value = next(iter(examples.values()))
-            if isinstance(example_value, dict):
-                return example_value.get("value")
-            return example_value
-
-        # Fallback to deprecated 'example' field
-        if "example" in media:
-            logger.debug("Using deprecated 'example' field. Consider using 'examples' instead.")
-            return media["example"]
-
-        # Generate from schema if no examples provided
-        schema = resolve_schema(media.get("schema", {}), openapi_spec)
-        if schema:
-            return build_example_from_schema(schema, openapi_spec)
+    example = _first_media_example(response.get("content", {}), openapi_spec, resolver)
+    if example is not _NO_EXAMPLE:
+        return example
 
     return {"errorCode": 0, "errorMessage": ""}
 
+def _first_media_example(
+    content: Dict[str, Any],
+    openapi_spec: Dict[str, Any],
+    resolver: Optional[SchemaResolver],
+) -> Any:
+    """
+    Взять пример из предпочтительного media type: examples, затем устаревший example,
+    затем построить по схеме. Возвращает _NO_EXAMPLE, если пример получить не из чего.
+    """
+    _, media = select_preferred_media(content)
+    if not media:
+        return _NO_EXAMPLE
+
+    # Prefer 'examples' over deprecated 'example' (per OpenAPI spec)
+    examples = media.get("examples")
+    if examples:
+        example_value = next(iter(examples.values()))
+        if isinstance(example_value, dict):
+            return example_value.get("value")
+        return example_value
+
+    # Fallback to deprecated 'example' field
+    if "example" in media:
+        logger.debug("Using deprecated 'example' field. Consider using 'examples' instead.")
+        return media["example"]
+
+    # Generate from schema if no examples provided
+    schema = _resolve(media.get("schema", {}), openapi_spec, resolver)
+    if schema:
+        return build_example_from_schema(schema, openapi_spec, resolver=resolver)
+
+    return _NO_EXAMPLE
+
+# Ограничение глубины рекурсии при построении примеров (защита от бесконечных циклов)
+_EXAMPLE_MAX_DEPTH = 20
+
+_EXAMPLE_DEFAULTS: Dict[str, Any] = {
+    "string": "string",
+    "integer": 0,
+    "number": 0,
+    "boolean": True,
+    "uuid": "123e4567-e89b-12d3-a456-426614174000",
+    "date-time": "2024-01-01T00:00:00Z",
+    "date": "2024-01-01",
+    "email": "user@example.com",
+}
+
+
 def build_example_from_schema(
     schema: Optional[Dict[str, Any]], 
     openapi_spec: Dict[str, Any],
-    visited: Optional[set] = None,
-    depth: int = 0
+    visited: Optional[Set[str]] = None,
+    depth: int = 0,
+    resolver: Optional[SchemaResolver] = None,
+    example_cache: Optional[Dict[int, Tuple[Dict[str, Any], Any, int]]] = None,
 ) -> Any:
     """
     Построить пример значения на основе схемы.
+
+    Args:
+        example_cache: Кэш готовых примеров для общих подсхем (например, Address,
+            на который ссылаются несколько тел). Достаточно одного кэша на операцию.
     """
     if visited is None:
         visited = set()
-    
-    # Ограничение глубины рекурсии для защиты от бесконечных циклов
-    MAX_DEPTH = 20
-    if depth > MAX_DEPTH:
-        logger.warning(f"Maximum recursion depth ({MAX_DEPTH}) exceeded in schema example generation. Returning empty object/array.")
-        return {}
+    if resolver is None:
+        resolver = SchemaResolver(openapi_spec)
+    if example_cache is None:
+        example_cache = {}
+    example, _ = _build_example(schema, openapi_spec, visited, depth, resolver, example_cache)
+    return example
+
+
+def _build_example(
+    schema: Optional[Dict[str, Any]],
+    openapi_spec: Dict[str, Any],
+    visited: Set[str],
+    depth: int,
+    resolver: Optional[SchemaResolver],
+    example_cache: Dict[int, Tuple[Dict[str, Any], Any, int]],
+    pre_resolved: Optional[Dict[str, Any]] = None,
+) -> Tuple[Any, Optional[int]]:
+    """
+    Рекурсивная часть build_example_from_schema.
+
+    Возвращает пример и высоту поддерева. Высота равна None, если результат зависит
+    от контекста вызова: проверялся $ref по visited или сработало ограничение глубины.
+    В example_cache попадают только независимые от контекста поддеревья, ключ -
+    id разрешённой схемы (сама схема хранится в записи, чтобы id не переиспользовался).
+    pre_resolved - уже разрешённая родителем схема, чтобы не разрешать её повторно.
+    """
+    if depth > _EXAMPLE_MAX_DEPTH:
+        logger.warning(f"Maximum recursion depth ({_EXAMPLE_MAX_DEPTH}) exceeded in schema example generation. Returning empty object/array.")
+        return {}, None
     
     original_schema = schema or {}
     original_ref = original_schema.get("$ref")
+    # Схема разрешается один раз; родитель передаёт уже разрешённую схему свойства/элемента
+    resolved = pre_resolved if pre_resolved is not None else _resolve(original_schema, openapi_spec, resolver)
     
-    # КРИТИЧНО: Проверяем цикл ДО разрешения, используя $ref из исходной схемы
+    # КРИТИЧНО: Проверяем цикл по $ref из исходной схемы
     # Это работает, потому что $ref стабилен и не меняется при разрешении
     if original_ref:
         if original_ref in visited:
             logger.warning(f"Circular reference detected for '{original_ref}' in schema example generation. Returning empty object/array.")
-            resolved = resolve_schema(original_schema, openapi_spec)
-            schema_type = get_schema_type(resolved) if isinstance(resolved, dict) else "unknown"
-            if schema_type == "array":
-                return []
-            return {}
+            if get_schema_type(resolved) == "array":
+                return [], None
+            return {}, None
         schema_key = original_ref
         visited.add(schema_key)
-        resolved = resolve_schema(original_schema, openapi_spec)
     else:
-        # Для схем без $ref разрешаем сначала
-        resolved = resolve_schema(original_schema, openapi_spec)
         # Пытаемся найти $ref в resolved схеме (может быть, если это была вложенная ссылка)
-        resolved_ref = resolved.get("$ref") if isinstance(resolved, dict) else None
+        resolved_ref = resolved.get("$ref")
         if resolved_ref:
             if resolved_ref in visited:
                 logger.warning(f"Circular reference detected for '{resolved_ref}' in schema example generation. Returning empty object/array.")
-                schema_type = get_schema_type(resolved) if isinstance(resolved, dict) else "unknown"
-                if schema_type == "array":
-                    return []
-                return {}
+                if get_schema_type(resolved) == "array":
+                    return [], None
+                return {}, None
             schema_key = resolved_ref
             visited.add(schema_key)
         else:
             # Нет $ref ни в исходной, ни в resolved схеме
-            # Для таких схем полагаемся только на ограничение глубины (MAX_DEPTH)
+            # Для таких схем полагаемся только на ограничение глубины (_EXAMPLE_MAX_DEPTH)
             # Не добавляем в visited, чтобы не блокировать легитимные вложенные структуры
             schema_key = None
     
+    height: Optional[int]
     try:
-        if "example" in resolved:
-            return resolved["example"]
-        
-        schema_type = get_schema_type(resolved)
-
-        if schema_type == "object":
-            example = {}
-            for name, prop_schema in resolved.get("properties", {}).items():
-                # Проверяем цикл по $ref из исходной схемы свойства
-                prop_ref = prop_schema.get("$ref") if isinstance(prop_schema, dict) else None
-                if prop_ref and prop_ref in visited:
-                    logger.warning(f"Skipping property '{name}' due to circular reference '{prop_ref}'")
-                    continue
-                # Также проверяем resolved схему свойства на наличие $ref
-                if isinstance(prop_schema, dict):
-                    prop_resolved = resolve_schema(prop_schema, openapi_spec)
-                    prop_resolved_ref = prop_resolved.get("$ref") if isinstance(prop_resolved, dict) else None
-                    if prop_resolved_ref and prop_resolved_ref in visited:
-                        logger.warning(f"Skipping property '{name}' due to circular reference in resolved schema '{prop_resolved_ref}'")
-                        continue
-                example[name] = build_example_from_schema(prop_schema, openapi_spec, visited, depth + 1)
-            return example or {}
-
-        if schema_type == "array":
-            item_schema = resolved.get("items", {})
-            # Проверяем цикл по $ref из исходной схемы элемента
-            item_ref = item_schema.get("$ref") if isinstance(item_schema, dict) else None
-            if item_ref and item_ref in visited:
-                logger.warning(f"Skipping array item due to circular reference '{item_ref}'")
-                return []
-            # Также проверяем resolved схему элемента на наличие $ref
-            if isinstance(item_schema, dict):
-                item_resolved = resolve_schema(item_schema, openapi_spec)
-                item_resolved_ref = item_resolved.get("$ref") if isinstance(item_resolved, dict) else None
-                if item_resolved_ref and item_resolved_ref in visited:
-                    logger.warning(f"Skipping array item due to circular reference in resolved schema '{item_resolved_ref}'")
-                    return []
-            
-            # Генерируем пример элемента массива
-            item_example = build_example_from_schema(item_schema, openapi_spec, visited, depth + 1)
-            
-            # Если элемент массива - это пустой объект {}, это обычно означает,
-            # что тип не был определен правильно. Для массивов в контексте ошибок
-            # (например, loc в FastAPI validation errors) это должны быть строки.
-            if isinstance(item_example, dict) and not item_example:
-                # Проверяем тип элемента в схеме
-                resolved_item = resolve_schema(item_schema, openapi_spec) if isinstance(item_schema, dict) else {}
-                item_type = resolved_item.get("type") if isinstance(resolved_item, dict) else None
-                
-                # Если тип явно указан как string, или не указан вообще (пустой объект),
-                # возвращаем строку (типично для loc в ошибках валидации)
-                if item_type == "string" or item_type is None:
-                    return ["string"]
-                # Для других типов возвращаем значение по умолчанию
-                return [item_example if item_example else "value"]
-            
-            return [item_example]
-
-        if "enum" in resolved:
-            return resolved["enum"][0]
-
-        defaults = {
-            "string": "string",
-            "integer": 0,
-            "number": 0,
-            "boolean": True,
-            "uuid": "123e4567-e89b-12d3-a456-426614174000",
-            "date-time": "2024-01-01T00:00:00Z",
-            "date": "2024-01-01",
-            "email": "user@example.com",
-        }
-
-        # Учитываем nullable
-        if resolved.get("nullable"):
-            return None
-
-        # Формат важнее базового типа
-        fmt = resolved.get("format")
-        if fmt and fmt in defaults:
-            return defaults[fmt]
-
-        return defaults.get(schema_type, "value")
+        cached = example_cache.get(id(resolved))
+        if cached is not None and depth + cached[2] <= _EXAMPLE_MAX_DEPTH:
+            example, height = cached[1], cached[2]
+        else:
+            example, height = _build_example_body(resolved, openapi_spec, visited, depth, resolver, example_cache)
+            if height is not None:
+                example_cache[id(resolved)] = (resolved, example, height)
+        # Собственный $ref проверялся по visited - для родителя результат зависит от контекста
+        return example, (None if schema_key is not None else height)
     finally:
         # Удаляем из visited только если schema_key был установлен
         if schema_key is not None:
             visited.discard(schema_key)
 
 
+def _build_example_body(
+    resolved: Dict[str, Any],
+    openapi_spec: Dict[str, Any],
+    visited: Set[str],
+    depth: int,
+    resolver: Optional[SchemaResolver],
+    example_cache: Dict[int, Tuple[Dict[str, Any], Any, int]],
+) -> Tuple[Any, Optional[int]]:
+    """
+    Построить пример по уже разрешённой схеме (см. _build_example).
+    """
+    if "example" in resolved:
+        return resolved["example"], 0
+    
+    schema_type = get_schema_type(resolved)
+
+    if schema_type == "object":
+        example = {}
+        height: Optional[int] = 0
+        # Локальные имена вместо поиска в globals на каждой итерации
+        resolve = _resolve
+        build = _build_example
+        for name, prop_schema in resolved.get("properties", {}).items():
+            # Проверяем цикл по $ref из исходной схемы свойства
+            prop_ref = prop_schema.get("$ref") if isinstance(prop_schema, dict) else None
+            if prop_ref and prop_ref in visited:
+                logger.warning(f"Skipping property '{name}' due to circular reference '{prop_ref}'")
+                height = None
+                continue
+            # Также проверяем resolved схему свойства на наличие $ref
+            prop_resolved = None
+            if needs_resolution(prop_schema):
+                prop_resolved = resolve(prop_schema, openapi_spec, resolver)
+                prop_resolved_ref = prop_resolved.get("$ref")
+                if prop_resolved_ref and prop_resolved_ref in visited:
+                    logger.warning(f"Skipping property '{name}' due to circular reference in resolved schema '{prop_resolved_ref}'")
+                    height = None
+                    continue
+            elif isinstance(prop_schema, dict):
+                # Встроенная схема без $ref уже разрешена
+                prop_resolved = prop_schema
+            example[name], prop_height = build(
+                prop_schema, openapi_spec, visited, depth + 1, resolver, example_cache, prop_resolved
+            )
+            if height is not None:
+                height = None if prop_height is None else max(height, prop_height + 1)
+        return example or {}, height
+
+    if schema_type == "array":
+        item_schema = resolved.get("items", {})
+        # Проверяем цикл по $ref из исходной схемы элемента
+        item_ref = item_schema.get("$ref") if isinstance(item_schema, dict) else None
+        if item_ref and item_ref in visited:
+            logger.warning(f"Skipping array item due to circular reference '{item_ref}'")
+            return [], None
+        # Также проверяем resolved схему элемента на наличие $ref
+        item_resolved = None
+        if needs_resolution(item_schema):
+            item_resolved = _resolve(item_schema, openapi_spec, resolver)
+            item_resolved_ref = item_resolved.get("$ref")
+            if item_resolved_ref and item_resolved_ref in visited:
+                logger.warning(f"Skipping array item due to circular reference in resolved schema '{item_resolved_ref}'")
+                return [], None
+        elif isinstance(item_schema, dict):
+            item_resolved = item_schema
+        
+        # Генерируем пример элемента массива
+        item_example, item_height = _build_example(
+            item_schema, openapi_spec, visited, depth + 1, resolver, example_cache, item_resolved
+        )
+        height = None if item_height is None else item_height + 1
+        
+        # Если элемент массива - это пустой объект {}, это обычно означает,
+        # что тип не был определен правильно. Для массивов в контексте ошибок
+        # (например, loc в FastAPI validation errors) это должны быть строки.
+        if isinstance(item_example, dict) and not item_example:
+            # Проверяем тип элемента в схеме
+            resolved_item = item_resolved if item_resolved is not None else {}
+            item_type = resolved_item.get("type")
+            
+            # Если тип явно указан как string, или не указан вообще (пустой объект),
+            # возвращаем строку (типично для loc в ошибках валидации)
+            if item_type == "string" or item_type is None:
+                return ["string"], height
+            # Для других типов возвращаем значение по умолчанию
+            return [item_example if item_example else "value"], height
+        
+        return [item_example], height
+
+    if "enum" in resolved:
+        return resolved["enum"][0], 0
+
+    # Учитываем nullable
+    if resolved.get("nullable"):
+        return None, 0
+
+    # Формат важнее базового типа
+    fmt = resolved.get("format")
+    if fmt and fmt in _EXAMPLE_DEFAULTS:
+        return _EXAMPLE_DEFAULTS[fmt], 0
+
+    return _EXAMPLE_DEFAULTS.get(schema_type, "value"), 0
+
+
 def deduplicate_parameters(parameters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Объединить параметры path-уровня и operation-уровня, оставляя приоритет operation.
     """
+    # У многих операций параметров нет - не создаём словарь и список впустую
+    if not parameters:
+        return []
     seen: Dict[Tuple[str, str], Dict[str, Any]] = {}
     for param in parameters:
         name = param.get("name")
@@ -676,12 +889,16 @@ def deduplicate_parameters(parameters: List[Dict[str, Any]]) -> List[Dict[str, A
     return list(seen.values())
 
 
-def extract_parameter_schema(parameter: Dict[str, Any], openapi_spec: Dict[str, Any]) -> Dict[str, Any]:
+def extract_parameter_schema(
+    parameter: Dict[str, Any],
+    openapi_spec: Dict[str, Any],
+    resolver: Optional[SchemaResolver] = None,
+) -> Dict[str, Any]:
     """
     Получить схему параметра, учитывая вариант с content (OpenAPI 3).
     """
     if "schema" in parameter:
-        return resolve_schema(parameter.get("schema", {}), openapi_spec)
+        return _resolve(parameter.get("schema", {}), openapi_spec, resolver)
 
     content = parameter.get("content")
     if not content:
@@ -690,7 +907,7 @@ def extract_parameter_schema(parameter: Dict[str, Any], openapi_spec: Dict[str,
     _, media = select_preferred_media(content)
     if not media:
         return {}
-    return resolve_schema(media.get("schema", {}), openapi_spec)
+    return _resolve(media.get("schema", {}), openapi_spec, resolver)
 
 
 def select_preferred_media(content: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
@@ -700,6 +917,10 @@ def select_preferred_media(content: Dict[str, Any]) -> Tuple[Optional[str], Opti
     if not content:
         return None, None
 
+    # Единственный media type выбирается при любом приоритете - сразу возвращаем его
+    if len(content) == 1:
+        return next(iter(content.items()))
+
     # Прямой приоритет application/json
     if "application/json" in content:
         return "application/json", content["application/json"]
@@ -710,5 +931,4 @@ def select_preferred_media(content: Dict[str, Any]) -> Tuple[Optional[str], Opti
             return media_type, media
 
     # Иначе первый попавшийся
-    media_type, media = next(iter(content.items()))
-    return media_type, media
+    return next(iter(content.items()))
@@ -1,9 +1,14 @@
 """
 Utility functions for filename generation.
 """
-from datetime import datetime
+import re
+from datetime import datetime, timezone
 from pathlib import Path
 
+# Characters outside this set are dropped; the result must stay latin-1 safe
+# because it goes straight into the Content-Disposition header
+_UNSAFE_FILENAME_RE = re.compile(r"[^A-Za-z0-9_-]+")
+
 
 def build_output_filename(original_name: str) -> str:
     """
@@ -16,8 +21,8 @@ def build_output_filename(original_name: str) -> str:
         Safe filename with timestamp.
     """
     stem = Path(original_name).stem or "openapi"
-    safe_stem = "".join(ch for ch in stem if ch.isalnum() or ch in ("-", "_")) or "openapi"
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    safe_stem = _UNSAFE_FILENAME_RE.sub("", stem) or "openapi"
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
     return f"{safe_stem}_doc_{timestamp}.docx"
 
 
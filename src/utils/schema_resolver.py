@@ -3,79 +3,172 @@ Schema resolution utilities for OpenAPI specifications.
 Handles $ref resolution with caching per OpenAPI 3.0 spec section 3.0.3.
 """
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-# Cache for resolved schemas to improve performance
-_schema_cache: Dict[str, Dict[str, Any]] = {}
 
-
-def clear_schema_cache() -> None:
+class SchemaResolver:
     """
-    Clear the schema resolution cache.
-    Should be called between processing different OpenAPI specs to avoid memory leaks.
+    Resolve $ref references of one OpenAPI specification per OpenAPI 3.0 spec section 3.0.3.
+
+    Resolved schemas, split pointers and the component index are cached on the instance,
+    so they live exactly as long as the resolver: create one per specification (one
+    conversion) and drop it afterwards - no global cache to clear between requests.
     """
-    global _schema_cache
-    _schema_cache.clear()
+
+    def __init__(self, openapi_spec: Dict[str, Any], build_index: bool = True) -> None:
+        """
+        Args:
+            openapi_spec: Full OpenAPI specification.
+            build_index: Index components on first lookup. Disable for one-off resolutions,
+                where walking a single pointer is cheaper than indexing every component.
+        """
+        self.openapi_spec = openapi_spec
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._ref_parts: Dict[str, Tuple[str, ...]] = {}
+        self._ref_index: Optional[Dict[str, Dict[str, Any]]] = None if build_index else {}
+
+    def resolve(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Resolve a schema that may contain $ref.
+
+        Args:
+            schema: Schema object that may contain $ref.
+
+        Returns:
+            Resolved schema dictionary; always a dict ({} for empty or non-object input).
+        """
+        if not schema or not isinstance(schema, dict):
+            return {}
+
+        ref = schema.get("$ref")
+        if not ref:
+            return schema
+
+        # Refs followed in this call; every one of them resolves to the final schema
+        chain: List[str] = []
+        current = schema
+
+        # Follow ref -> ref chains in a loop; stop at a schema without $ref or one that cannot be followed
+        while ref:
+            # Check cache first
+            cached = self._cache.get(ref)
+            if cached is not None:
+                current = cached
+                break
+
+            if ref in chain:
+                logger.warning("Circular $ref chain detected at '%s', stopping resolution", ref)
+                break
+
+            # Handle external references (not supported yet, return original)
+            if not ref.startswith("#/"):
+                logger.warning(
+                    "External reference '%s' is not supported. "
+                    "Only local references (#/components/...) are supported.",
+                    ref,
+                )
+                break
+
+            # Component refs are a single index lookup; anything else walks the pointer
+            if self._ref_index is None:
+                self._ref_index = _build_ref_index(self.openapi_spec)
+            resolved = self._ref_index.get(ref)
+            if resolved is None:
+                resolved = self._walk_local_ref(ref)
+                if resolved is None:
+                    break
+
+            chain.append(ref)
+            current = resolved
+            ref = current.get("$ref")
+
+        # Cache the result
+        for chained_ref in chain:
+            self._cache[chained_ref] = current
+
+        return current
+
+    def _walk_local_ref(self, ref: str) -> Any:
+        """
+        Follow a local "#/..." pointer through the spec.
+
+        Returns:
+            The target object, or None (after logging a warning) if it cannot be resolved.
+        """
+        parts = self._ref_parts.get(ref)
+        if parts is None:
+            # resolve() only walks refs starting with "#/"; strip exactly that prefix
+            parts = self._ref_parts[ref] = tuple(ref[2:].split("/"))
+        resolved: Any = self.openapi_spec
+
+        for part in parts:
+            if not isinstance(resolved, dict):
+                logger.warning("Failed to resolve $ref '%s': expected object at '%s'", ref, part)
+                return None
+            resolved = resolved.get(part)
+            if resolved is None:
+                logger.warning("Failed to resolve $ref '%s': missing key '%s'", ref, part)
+                return None
+
+        if not isinstance(resolved, dict):
+            logger.warning("Failed to resolve $ref '%s': resolved value is not an object", ref)
+            return None
+
+        return resolved
 
 
 def resolve_schema(schema: Dict[str, Any], openapi_spec: Dict[str, Any]) -> Dict[str, Any]:
     """
     Resolve $ref references per OpenAPI 3.0 spec section 3.0.3.
-    Handles local references (#/components/schemas/User) with caching for performance.
+    One-off resolution without caching between calls; use SchemaResolver for repeated lookups.
     
     Args:
         schema: Schema object that may contain $ref.
         openapi_spec: Full OpenAPI specification.
         
     Returns:
-        Resolved schema dictionary.
+        Resolved schema dictionary; always a dict ({} for empty or non-object input).
     """
-    if not schema:
+    if not schema or not isinstance(schema, dict):
         return {}
 
-    ref = schema.get("$ref")
-    if not ref:
-        return schema
-    
-    # Check cache first
-    cache_key = f"{id(openapi_spec)}:{ref}"
-    if cache_key in _schema_cache:
-        return _schema_cache[cache_key]
-    
-    # Handle external references (not supported yet, return original)
-    if not ref.startswith("#/"):
-        logger.warning(
-            f"External reference '{ref}' is not supported. "
-            "Only local references (#/components/...) are supported."
-        )
+    if not needs_resolution(schema):
         return schema
-    
-    # Resolve local reference
-    parts = ref.lstrip("#/").split("/")
-    resolved: Any = openapi_spec
-    
-    for part in parts:
-        if not isinstance(resolved, dict):
-            logger.warning(f"Failed to resolve $ref '{ref}': expected object at '{part}'")
-            return schema
-        resolved = resolved.get(part)
-        if resolved is None:
-            logger.warning(f"Failed to resolve $ref '{ref}': missing key '{part}'")
-            return schema
 
-    if not isinstance(resolved, dict):
-        logger.warning(f"Failed to resolve $ref '{ref}': resolved value is not an object")
-        return schema
+    return SchemaResolver(openapi_spec, build_index=False).resolve(schema)
 
-    # Recursively resolve nested references
-    resolved_schema = resolve_schema(resolved, openapi_spec)
-    
-    # Cache the result
-    _schema_cache[cache_key] = resolved_schema
-    
-    return resolved_schema
+
+def needs_resolution(schema: Any) -> bool:
+    """
+    Check whether a schema carries a $ref that has to be resolved.
+
+    Lets hot loops use inline schemas as-is instead of calling the resolver for them.
+    """
+    return isinstance(schema, dict) and "$ref" in schema
+
+
+def _build_ref_index(openapi_spec: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Map every "#/components/<section>/<name>" pointer to its object.
+
+    Only object values whose names need no pointer escaping are indexed; everything
+    else is left to the pointer walk so it gets the same warnings as before.
+    """
+    index: Dict[str, Dict[str, Any]] = {}
+    components = openapi_spec.get("components")
+    if not isinstance(components, dict):
+        return index
+
+    for section, entries in components.items():
+        if not isinstance(entries, dict):
+            continue
+        prefix = f"#/components/{section}/"
+        for name, component in entries.items():
+            if isinstance(component, dict) and "/" not in name and "~" not in name:
+                index[prefix + name] = component
+    return index
 
 
 def get_schema_type(schema: Dict[str, Any]) -> str:
@@ -105,7 +198,8 @@ def get_schema_type(schema: Dict[str, Any]) -> str:
 
     ref = schema.get("$ref")
     if ref:
-        return ref.split("/")[-1]
+        # Only the component name is needed; no need to split the whole pointer
+        return ref.rsplit("/", 1)[-1]
 
     return "object"
 
@@ -2,10 +2,17 @@
 OpenAPI specification validation per OpenAPI 3.0 spec.
 """
 import logging
+import re
 from typing import Any, Dict
 
 logger = logging.getLogger(__name__)
 
+# Leading "major.minor" of the 'openapi' version string
+_VERSION_RE = re.compile(r"^(\d+)\.(\d+)")
+
+# How many non-conforming paths are listed in the warning
+_MAX_REPORTED_PATHS = 10
+
 
 def validate_openapi_spec(openapi_spec: Dict[str, Any]) -> None:
     """
@@ -18,59 +25,57 @@ def validate_openapi_spec(openapi_spec: Dict[str, Any]) -> None:
         ValueError: If the specification is invalid.
     """
     # Check required 'openapi' field (section 3.0.0)
-    if "openapi" not in openapi_spec:
+    openapi_version = openapi_spec.get("openapi")
+    if openapi_version is None:
         raise ValueError(
             "Invalid OpenAPI specification: missing required 'openapi' field. "
             "Per OpenAPI 3.0 spec section 3.0.0, this field is required."
         )
     
     # Validate OpenAPI version (must be 3.0.0 or higher)
-    openapi_version = openapi_spec.get("openapi", "")
-    try:
-        version_parts = openapi_version.split(".")
-        major = int(version_parts[0])
-        minor = int(version_parts[1]) if len(version_parts) > 1 else 0
-        
-        if major < 3 or (major == 3 and minor < 0):
-            raise ValueError(
-                f"Unsupported OpenAPI version: {openapi_version}. "
-                "This service requires OpenAPI 3.0.0 or higher."
-            )
-    except (ValueError, IndexError):
+    match = _VERSION_RE.match(openapi_version) if isinstance(openapi_version, str) else None
+    if match is None:
         raise ValueError(
             f"Invalid OpenAPI version format: {openapi_version}. "
             "Expected format: '3.0.0' or higher."
         )
+    if int(match.group(1)) < 3:
+        raise ValueError(
+            f"Unsupported OpenAPI version: {openapi_version}. "
+            "This service requires OpenAPI 3.0.0 or higher."
+        )
     
     # Check required 'info' field (section 3.1.0)
-    if "info" not in openapi_spec:
+    if openapi_spec.get("info") is None:
         raise ValueError(
             "Invalid OpenAPI specification: missing required 'info' field. "
             "Per OpenAPI 3.0 spec section 3.1.0, this field is required."
         )
     
     # Check required 'paths' field (section 3.0.0)
-    if "paths" not in openapi_spec:
+    paths = openapi_spec.get("paths")
+    if paths is None:
         raise ValueError(
             "Invalid OpenAPI specification: missing required 'paths' field. "
             "Per OpenAPI 3.0 spec section 3.0.0, this field is required."
         )
     
     # Validate paths object
-    paths = openapi_spec.get("paths", {})
     if not isinstance(paths, dict):
         raise ValueError(
             "Invalid OpenAPI specification: 'paths' must be an object. "
             "Per OpenAPI 3.0 spec section 3.1.0."
         )
     
-    # Validate each path starts with '/'
-    for path in paths.keys():
-        if not path.startswith("/"):
-            logger.warning(
-                f"Path '{path}' does not start with '/'. "
-                "Per OpenAPI 3.0 spec section 3.1.0, paths should start with '/'."
-            )
+    # Validate each path starts with '/'; offenders are reported in one warning
+    bad_paths = [path for path in paths if not path.startswith("/")]
+    if bad_paths:
+        logger.warning(
+            "%d path(s) do not start with '/': %s. "
+            "Per OpenAPI 3.0 spec section 3.1.0, paths should start with '/'.",
+            len(bad_paths),
+            bad_paths[:_MAX_REPORTED_PATHS],
+        )
 
 
 